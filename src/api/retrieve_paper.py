@@ -1,22 +1,87 @@
-import itertools as i
-import xml.etree as xe
-import xml.etree.ElementTree as xee
-from typing import Iterable, List, Tuple, Generator
+import concurrent.futures as cf
+import functools as ft
+import time
+import urllib.parse as up
+from typing import Dict, Iterable, List, Tuple, Generator, Union
 
 import requests as r
+from lxml import etree as xee
 
 import src.utility.base_query as bq
 import src.utility.search_result as sr
 
+MAX_CONCURRENT_REQUESTS = 3  # bound on parallel page downloads, keeps within arXiv's rate limits
+RESULT_CACHE_TTL = 600  # seconds a cached page of results is considered fresh
+RESULT_CACHE_MAX_SIZE = 128
+
+# pages of already parsed results, keyed on (query url, start, space) - arXiv results are stable enough over
+# a session that rerunning the same search shouldn't pay for the network round trip and parse again
+_result_cache: Dict[Tuple[str, int, int], Tuple[float, List[sr.SearchResult]]] = {}
+
+# starting responses keyed the same way, holding (totalResults, first page) so rerunning a search skips the
+# initial fetch and parse entirely - single-page queries never touch the network again while fresh
+_first_page_cache: Dict[Tuple[str, int, int], Tuple[float, Tuple[int, List[sr.SearchResult]]]] = {}
+
+
+def _read_cached(cache: dict, key: Tuple[str, int, int]):
+    cached = cache.get(key)
+    if cached and time.monotonic() - cached[0] < RESULT_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+def _cache_value(cache: dict, key: Tuple[str, int, int], value) -> None:
+    if len(cache) >= RESULT_CACHE_MAX_SIZE:
+        del cache[min(cache, key=lambda k: cache[k][0])]  # evict the stalest entry
+    cache[key] = (time.monotonic(), value)
+
+
+@ft.lru_cache(maxsize=256)
+def _build_query_url(title_args: Tuple[str, ...], author_args: Tuple[str, ...], abstract_args: Tuple[str, ...],
+                     id_args: Tuple[str, ...]) -> str:
+    """Builds the percent-encoded arXiv query url for the given search arguments, cached so repeated constructions
+    of the same query skip reassembly
+    :param title_args: arguments to search for in papers's titles
+    :param author_args: arguments to search for in papers's authors
+    :param abstract_args: arguments to search for in paper's abstracts
+    :param id_args: arguments to search for in paper's arxiv IDs
+    :return: full query url for the given arguments
+    """
+    search_params = []
+    for code, args in (('ti', title_args), ('au', author_args), ('abs', abstract_args)):
+        search_params.extend(f'{code}:{arg}' for arg in args)
+
+    # collect only the non-empty url segments and encode them once - urlencode percent-escapes user supplied
+    # terms, while '+', ':' and ',' stay literal as the arXiv api expects
+    segments = []
+    if search_params:
+        segments.append(('search_query', '+AND+'.join(search_params)))
+    if id_args:
+        segments.append(('id_list', ','.join(id_args)))
+    return SearchQuery.BASE_QUERY_URL + up.urlencode(segments, quote_via=up.quote, safe='+:,')
+
 
 class SearchQuery(bq.BaseQuery):
     """Represents a search query for papers on Arxiv"""
 
     BASE_QUERY_URL = 'http://export.arxiv.org/api/query/?'
     BASE_ARXIV_URL = 'http://arxiv.org/abs/'
+    REQUEST_INTERVAL = 3  # seconds arXiv asks clients to wait between successive API calls
     XML_ATOM_ROOT = '{http://www.w3.org/2005/Atom}'
     XML_OPEN_SEARCH_ROOT = '{http://a9.com/-/spec/opensearch/1.1/}'
 
+    # fully qualified tag names, precomputed once so the parse loop never concatenates namespace strings
+    _ENTRY = XML_ATOM_ROOT + 'entry'
+    _TITLE = XML_ATOM_ROOT + 'title'
+    _ID = XML_ATOM_ROOT + 'id'
+    _SUMMARY = XML_ATOM_ROOT + 'summary'
+    _PUBLISHED = XML_ATOM_ROOT + 'published'
+    _UPDATED = XML_ATOM_ROOT + 'updated'
+    _LINK = XML_ATOM_ROOT + 'link'
+    _AUTHOR = XML_ATOM_ROOT + 'author'
+    _NAME = XML_ATOM_ROOT + 'name'
+    _TOTAL_RESULTS = XML_OPEN_SEARCH_ROOT + 'totalResults'
+
     def __init__(self, title_args: Iterable[str] = (), author_args: Iterable[str] = (),
                  abstract_args: Iterable[str] = (), id_args: Iterable[str] = (),
                  max_result: int = 10, start: int = 0) -> None:
@@ -29,100 +94,209 @@ class SearchQuery(bq.BaseQuery):
         :param start: page to start searching on
         :return: None
         """
+        # normalize to tuples so the url builder's cache can hash the arguments
+        title_args, author_args = tuple(title_args), tuple(author_args)
+        abstract_args, id_args = tuple(abstract_args), tuple(id_args)
         super().__init__(title_args=title_args, author_args=author_args, abstract_args=abstract_args,
                          id_args=id_args, max_result=max_result, start=start)
-        search_codes_to_params = {'ti': title_args, 'au': author_args, 'abs': abstract_args}
-
-        id_args = ('id_list=' + ','.join(id_args)) if id_args else ''
+        self.query = _build_query_url(title_args, author_args, abstract_args, id_args)
 
-        formatted_params = list(i.chain.from_iterable([[f'{code}:{param}' for param in params]
-                                                       for code, params in search_codes_to_params.items()]))
-        formatted_params = ('search_query=' + '+AND+'.join(formatted_params)) if formatted_params else ''
-
-        params = ''
-        if formatted_params and id_args:
-            params = formatted_params + id_args
-        elif id_args:
-            params = id_args
-        elif formatted_params:
-            params = formatted_params
-        self.query = self.BASE_QUERY_URL + params
+        # one session for every page of this query, reusing the TCP connection across the pagination loop
+        self._session = r.Session()
+        self._session.headers['Accept-Encoding'] = 'gzip'
 
     def get_response_with_limited_query(self, start: int, space: int) -> r.Response:
-        return r.get(self.query + f'&start={start}&max_result={space}')
+        return self._session.get(self.query + f'&start={start}&max_results={space}', stream=True)
 
     def get_response_with_starting_query(self) -> r.Response:
         return self.get_response_with_limited_query(self.start, self.max_result)
 
-    def get_xml_tree(self, text: str) -> xe.ElementTree:
-        return xe.ElementTree.fromstring(text)
+    def _get_xml_tree(self, text: Union[bytes, str]) -> xee._Element:
+        # prefer raw bytes so libxml2 decodes once itself, but accept strings for callers holding decoded text
+        return xee.fromstring(text if isinstance(text, (bytes, bytearray)) else text.encode('utf-8'))
+
+    def retrieve_search_results(self, force_refresh: bool = False) \
+            -> Generator[List[sr.SearchResult], None, None]:
+        first_page = self.fetch_or_recall_first_page(force_refresh)
+        if isinstance(first_page, str):  # arXiv rejected the query, surface its error message
+            return first_page
+        total_results, first_results = first_page
+        return self.retrieve_valid_search_results(first_results, self.start, self.max_result, total_results,
+                                                  force_refresh)
+
+    def fetch_or_recall_first_page(self, force_refresh: bool) -> Union[Tuple[int, List[sr.SearchResult]], str]:
+        """Returns totalResults and the first page of results for the starting query, served from the cache when a
+        fresh entry exists so rerunning a search skips the initial round trip, or the parsed arXiv error message if
+        the starting request failed
+        :param force_refresh: if True, skip the cache and refetch the starting page
+        :return: totalResults and the first page of parsed results, or an error message
+        """
+        starting_key = (self.query, self.start, self.max_result)
+        if not force_refresh:
+            cached = _read_cached(_first_page_cache, starting_key)
+            if cached is not None:
+                return cached
 
-    def retrieve_search_results(self) -> Generator[List[Tuple[int, sr.SearchResult]], None, None]:
         response = self.get_response_with_starting_query()
-        if response.ok:  # ok, begin recursive parsing
-            root = self.get_xml_tree(response.text)
-            total_results = int(self.get_open_search_child(root, 'totalResults').text)
-            return self.retrieve_valid_search_results(self.start, self.max_result, total_results)
-        return self.parse_error(response.text)
-
-    def retrieve_valid_search_results(self, start: int, space: int, end: int) \
-            -> Generator[List[Tuple[int, sr.SearchResult]], None, None]:
-        count = 0
-        while True:
-            search_results = self.parse_valid_response(self.get_response_with_limited_query(start, space).text)
-            count += len(search_results)
-            yield list(enumerate(search_results))
+        if not response.ok:
+            return self.parse_error(response.content)
+        first_page = self.parse_first_response(response)
+        _cache_value(_first_page_cache, starting_key, first_page)
+        return first_page
 
-            start += space
-            if start > end:
-                break
+    def parse_first_response(self, response: r.Response) -> Tuple[int, List[sr.SearchResult]]:
+        """Parses the starting response in one streaming pass, reading both the opensearch totalResults count at the
+        feed head and the first page of entries so the first page isn't fetched and parsed a second time
+        :param response: streamed response to an arXiv query
+        :return: total number of results the query matched and the first page of parsed results
+        """
+        response.raw.decode_content = True  # iterparse reads the raw socket, undo any transport compression
+        total_results = 0
+        parsed_entries = []
+        for _, elem in xee.iterparse(response.raw, events=('end',), tag=(self._TOTAL_RESULTS, self._ENTRY)):
+            if elem.tag == self._TOTAL_RESULTS:
+                total_results = int(elem.text)
+            else:
+                parsed_entries.append(self.parse_entry(elem))
 
-    def get_atom_child(self, parent: xee.Element, tag: str) -> xee.Element:
-        return parent.find(self.XML_ATOM_ROOT + tag)
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        return total_results, parsed_entries
 
-    def get_atom_child_text(self, parent: xee.Element, tag: str) -> str:
-        return self.get_atom_child(parent, tag).text
+    def get_response_after_request_interval(self, start: int, space: int) -> r.Response:
+        time.sleep(self.REQUEST_INTERVAL)
+        return self.get_response_with_limited_query(start, space)
 
-    def get_atom_children(self, parent: xee.Element, tag: str) -> List[xee.Element]:
-        return parent.findall(self.XML_ATOM_ROOT + tag)
+    def retrieve_all_search_results(self, force_refresh: bool = False) \
+            -> Generator[List[sr.SearchResult], None, None]:
+        """Like retrieve_search_results, but downloads every remaining page concurrently instead of prefetching one
+        page ahead - best for queries consumed in full, where total wall time matters more than time to first page
+        :param force_refresh: if True, skip the result cache and refetch every page
+        :return: generator over pages of parsed results
+        """
+        first_page = self.fetch_or_recall_first_page(force_refresh)
+        if isinstance(first_page, str):  # arXiv rejected the query, surface its error message
+            return first_page
+        total_results, first_results = first_page
+        return self.retrieve_all_valid_search_results(first_results, self.start, self.max_result, total_results,
+                                                      force_refresh)
 
-    def get_open_search_child(self, parent: xee.Element, tag: str) -> xee.Element:
-        return parent.find(self.XML_OPEN_SEARCH_ROOT + tag)
+    def retrieve_all_valid_search_results(self, first_page: List[sr.SearchResult], start: int, space: int, end: int,
+                                          force_refresh: bool = False) \
+            -> Generator[List[sr.SearchResult], None, None]:
+        yield first_page
+        # every remaining page strictly below totalResults, with the final page clamped so it doesn't over-request
+        pages = [(offset, min(space, end - offset)) for offset in range(start + space, end, space)]
+        with cf.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            # kick off every remaining page at once, then resolve them in page order as they land
+            fetches = [self.fetch_or_recall_page(executor, offset, page_space, force_refresh)
+                       for offset, page_space in pages]
+            for (offset, page_space), page in zip(pages, fetches):
+                yield self.resolve_page(page, offset, page_space)
 
-    def parse_valid_response(self, xml_response: str) -> List[sr.SearchResult]:
-        root = self.get_xml_tree(xml_response)
-        entries = self.get_atom_children(root, 'entry')
-        parsed_entries = []
-        for entry in entries:
-            title = self.get_atom_child_text(entry, 'title')
+    def fetch_or_recall_page(self, executor: cf.ThreadPoolExecutor, start: int, space: int, force_refresh: bool) \
+            -> Union[List[sr.SearchResult], cf.Future]:
+        """Returns the cached results for the given page if still fresh, otherwise a Future downloading it after
+        arXiv's request interval has passed
+        :param executor: executor to run the download on
+        :param start: offset of the page to fetch
+        :param space: number of results on the page
+        :param force_refresh: if True, skip the cache and refetch the page
+        :return: parsed results for the page or a Future resolving to its response
+        """
+        if not force_refresh:
+            cached = _read_cached(_result_cache, (self.query, start, space))
+            if cached is not None:
+                return cached
+        return executor.submit(self.get_response_after_request_interval, start, space)
 
-            arxiv_id = self.get_atom_child_text(entry, 'id')
-            if arxiv_id.startswith(self.BASE_ARXIV_URL):
-                arxiv_id = arxiv_id[len(self.BASE_ARXIV_URL):]
+    def resolve_page(self, page: Union[List[sr.SearchResult], cf.Future], start: int, space: int) \
+            -> List[sr.SearchResult]:
+        """Turns the result of fetch_or_recall_page into a list of SearchResults, caching freshly parsed pages
+        :param page: cached results or a pending download
+        :param start: offset of the page
+        :param space: number of results on the page
+        :return: parsed results for the page
+        """
+        if isinstance(page, list):  # cache hit, nothing to download or parse
+            return page
+        search_results = self.parse_valid_response(page.result())
+        _cache_value(_result_cache, (self.query, start, space), search_results)
+        return search_results
 
-            abstract = self.get_atom_child_text(entry, 'summary')
+    def retrieve_valid_search_results(self, first_page: List[sr.SearchResult], start: int, space: int, end: int,
+                                      force_refresh: bool = False) \
+            -> Generator[List[sr.SearchResult], None, None]:
+        count = 0
+        with cf.ThreadPoolExecutor(max_workers=1) as executor:
+            next_page, next_space = first_page, space  # first page already parsed out of the starting response
+            while True:
+                page, page_start, page_space = next_page, start, next_space
+                start += page_space
+                if start < end:  # download the next page while the caller consumes this one
+                    next_space = min(space, end - start)  # clamp the final page so it doesn't over-request
+                    next_page = self.fetch_or_recall_page(executor, start, next_space, force_refresh)
 
-            date = self.get_atom_child_text(entry, 'published')
-            updated_dates = self.get_atom_children(entry, 'updated')
-            if updated_dates:
-                date = updated_dates[-1].text
+                search_results = self.resolve_page(page, page_start, page_space)
+                count += len(search_results)
+                yield search_results
 
-            pdf_link = None
-            for link in self.get_atom_children(entry, 'link'):
-                if link.get('title'):
-                    pdf_link = link.get('href')
+                if start >= end:
                     break
 
-            authors = [self.get_atom_child(author, 'name').text for author in self.get_atom_children(entry, 'author')]
+    def parse_entry(self, entry: xee._Element) -> sr.SearchResult:
+        """Parses a single Atom entry element into a SearchResult
+        :param entry: entry element to parse
+        :return: parsed SearchResult
+        """
+        # fill every field in one walk over the entry's children rather than one find/findall per field
+        title = arxiv_id = abstract = published = updated = pdf_link = None
+        authors = []
+        for child in entry:
+            tag = child.tag
+            if tag == self._TITLE:
+                title = child.text
+            elif tag == self._ID:
+                arxiv_id = child.text
+            elif tag == self._SUMMARY:
+                abstract = child.text
+            elif tag == self._PUBLISHED:
+                published = child.text
+            elif tag == self._UPDATED:
+                updated = child.text  # last updated date wins
+            elif tag == self._LINK and pdf_link is None:
+                if child.get('title'):  # the pdf link is the only titled link on an entry
+                    pdf_link = child.get('href')
+            elif tag == self._AUTHOR:
+                authors.append(child.find(self._NAME).text)
+
+        arxiv_id = arxiv_id.removeprefix(self.BASE_ARXIV_URL)
+        date = published if updated is None else updated
+        return sr.SearchResult(title=title, id=arxiv_id, abstract=abstract, authors=authors,
+                               pdf_url=pdf_link, publish=date, keywords=set())
 
-            parsed_entries.append(sr.SearchResult(title=title, id=arxiv_id, abstract=abstract, authors=authors,
-                                                  pdf_url=pdf_link, publish=date, keywords=set()))
+    def parse_valid_response(self, response: r.Response) -> List[sr.SearchResult]:
+        response.raw.decode_content = True
+        parsed_entries = []
+        # stream entries off the socket as they complete instead of materializing the whole feed DOM
+        for _, entry in xee.iterparse(response.raw, events=('end',), tag=self._ENTRY):
+            parsed_entries.append(self.parse_entry(entry))
+
+            entry.clear()  # drop the entry's subtree and any already-parsed siblings to keep peak memory flat
+            while entry.getprevious() is not None:
+                del entry.getparent()[0]
         return parsed_entries
 
-    def parse_error(self, error_msg: str):
-        root = xe.ElementTree.fromstring(error_msg)
-        entry = self.get_atom_child(root, 'entry')
-        return self.get_atom_child(entry, 'summary').text
+    def parse_error(self, error_msg: Union[bytes, str]):
+        root = self._get_xml_tree(error_msg)
+        return root.find(self._ENTRY).find(self._SUMMARY).text
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __del__(self):
+        self.close()
 
     def __str__(self):
         return self.query
@@ -7,9 +7,6 @@ from typing import List
 import read_env as re
 
 import src.db_util as db
-import src.modes.search_mode as se
-import src.modes.suggest_mode as sm
-import src.modes.view_mode as ve
 import src.util as u
 import src.utility.cmd_enum as ce
 import src.utility.save_query as sq
@@ -18,6 +15,23 @@ import src.utility.save_query as sq
 can select from."""
 
 
+def enter_search_mode() -> None:
+    # mode modules are imported on first selection so shell startup doesn't pay for machinery the user may
+    # never invoke - repeat selections hit the already loaded module via sys.modules
+    import src.modes.search_mode as se
+    se.search_mode()
+
+
+def enter_suggest_mode() -> None:
+    import src.modes.suggest_mode as sm
+    sm.suggest_mode()
+
+
+def enter_view_mode() -> None:
+    import src.modes.view_mode as ve
+    ve.view_mode()
+
+
 def load_env_file(env_path: pl.Path) -> None:
     """Loads the environmental variables of the environmental variables path into the system
     :param env_path: path to the environmental variables file
@@ -34,9 +48,9 @@ SCHEMA_FILE = pl.Path(__file__).parent.parent.joinpath('schema.sql')
 
 class UserOptions(ce.CmdEnum):
     """Set of supported "modes" mapped to allocated keywords for calling."""
-    SEARCH = ce.Command('search', lambda x, y : se.search_mode(), 'search for papers')
-    SUGGEST = ce.Command('suggest', lambda x, y: sm.suggest_mode(), 'suggested papers based on gathered citations')
-    SAVED = ce.Command('saved', lambda x, y: ve.view_mode(), 'view previously saved papers')
+    SEARCH = ce.Command('search', lambda x, y: enter_search_mode(), 'search for papers')
+    SUGGEST = ce.Command('suggest', lambda x, y: enter_suggest_mode(), 'suggested papers based on gathered citations')
+    SAVED = ce.Command('saved', lambda x, y: enter_view_mode(), 'view previously saved papers')
     EXIT = ce.Command('exit', lambda x, y: sys.exit(), 'exit the program')
     HELP = ce.Command('help', lambda x, y: UserOptions.display_help_options(), 'what each mode does')
 
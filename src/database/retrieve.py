@@ -1,6 +1,6 @@
 import argparse as ap
 import pathlib as pl
-from typing import List, Tuple, Iterable, Dict
+from typing import Generator, List, Tuple, Iterable, Dict
 
 from psycopg2 import sql
 
@@ -86,7 +86,7 @@ class DatabaseQuery(bq.BaseQuery):
                 # TODO retrieve keywords
         return list(search_results.values())
 
-    def get_results(self) -> List[Tuple[int, sr.SearchResult]]:
+    def get_results(self) -> Generator[List[sr.SearchResult], None, None]:
 
         def execute(cursor):
             cursor.execute(self.as_sql_query())
@@ -96,8 +96,7 @@ class DatabaseQuery(bq.BaseQuery):
         search_results = self.aggregate_results(results)
         count = self.start
         while count < len(search_results):
-            gen_results = search_results[count:count + self.max_result]
-            yield [(count + idx, result) for idx, result in enumerate(gen_results)]
+            yield search_results[count:count + self.max_result]
             count += self.max_result
 
     @classmethod
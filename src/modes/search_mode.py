@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Generator
+from typing import List, Generator
 
 import src.api.retrieve_paper as rp
 import src.modes.search_options as so
@@ -9,7 +9,7 @@ import src.utility.search_result as sr
 """Mode for searching for and saving papers from arXiv."""
 
 
-def search_mode_retrieval() -> Generator[List[Tuple[int, sr.SearchResult]], None, None]:
+def search_mode_retrieval() -> Generator[List[sr.SearchResult], None, None]:
     print('search mode entered')
     search_query = rp.SearchQuery.from_args()
     print('results fetched')
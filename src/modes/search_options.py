@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Callable, Generator, Tuple
+from typing import List, Callable, Generator
 
 import src.util as u
 import src.utility.cmd_enum as ce
@@ -69,12 +69,12 @@ class UserSearchOptions(ce.CmdEnum):
         return UserSearchOptions(super().execute_params_with_checks(args, save_query))
 
 
-def generic_search_mode(retrieval_func: Callable[[], Generator[List[Tuple[int, sr.SearchResult]], None, None]]):
+def generic_search_mode(retrieval_func: Callable[[], Generator[List[sr.SearchResult], None, None]]):
     save_query = sq.SaveQuery()
     for responses in retrieval_func():
         time_to_quit = False
         responses_print_func = u.create_result_display_func(responses)
-        for result_id, response in responses:
+        for result_id, response in enumerate(responses):
             save_query.add_valid_id(result_id, response)
 
         responses_print_func()
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Callable
+from typing import List, Callable
 
 import src.utility.search_result as sr
 
@@ -41,8 +41,8 @@ def is_list_of_n_ints(to_parse: List[str], n: int = -1) -> List[int]:
     return [int(item) for item in to_parse]
 
 
-def create_result_display_func(responses: List[Tuple[int, sr.SearchResult]]) -> Callable:
+def create_result_display_func(responses: List[sr.SearchResult]) -> Callable:
     def print_results():
-        for result_id, response in responses:
+        for result_id, response in enumerate(responses):
             print(result_id, response.title)
     return print_results
@@ -3,7 +3,7 @@ from __future__ import annotations
 import abc
 import dataclasses as dc
 import enum as e
-from typing import Any, List, Callable
+from typing import Any, Dict, List, Callable
 
 import src.utility.save_query as sq
 
@@ -23,6 +23,18 @@ class CmdEnum(e.Enum):
             return other == self.value.name
         return False
 
+    @classmethod
+    def members_by_name(cls) -> Dict[str, CmdEnum]:
+        """Maps each member's command name to the member itself, for dispatching on a raw command string with one
+        dict lookup instead of a linear scan over the enum - built once per subclass then reused
+        :return: mapping of command name to member
+        """
+        mapping = cls.__dict__.get('_members_by_name')  # read off cls itself, not an inherited map
+        if mapping is None:
+            mapping = {mode.value.name: mode for mode in cls}
+            cls._members_by_name = mapping
+        return mapping
+
     @classmethod
     def is_valid(cls: type, other: str) -> bool:
         return any([other == item.value.name for item in cls])
@@ -64,8 +76,9 @@ class CmdEnum(e.Enum):
                 check(args)
 
         cmd, params = args[0], args[1:]
-        for mode in cls:
-            if cmd == mode:
-                mode.value.func(params, save_query)
-                return mode
-        raise ValueError(f'invalid response {cmd}, must be one of {cls.values_as_str()}')
+        try:
+            mode = cls.members_by_name()[cmd]
+        except KeyError:
+            raise ValueError(f'invalid response {cmd}, must be one of {cls.values_as_str()}')
+        mode.value.func(params, save_query)
+        return mode